@@ -15,13 +15,33 @@ Enhanced with resume capability and progress tracking.
 
 import sqlite3
 import os
+import errno
 import shutil
 import datetime
 import logging
+import logging.handlers
+import queue
+import atexit
 import sys
 import time
+import traceback
+import itertools
+import operator
+from collections import deque
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+if sys.platform == 'darwin':
+    import ctypes
+    import posix
+    
+    # clonefile(2) - APFS copy-on-write clone (macOS 10.12+)
+    _clonefile_fn = getattr(ctypes.CDLL(None, use_errno=True), 'clonefile', None)
+else:
+    _clonefile_fn = None
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -32,11 +52,25 @@ DRY_RUN = False
 # Set to True to skip files that already exist (resume mode)
 RESUME_MODE = True
 
+# Set to True to open chat.db as immutable (no locking or change checks at all).
+# Only safe while Messages is quit - an immutable open ignores the WAL file,
+# so messages Messages hasn't checkpointed yet would be missing from the export.
+IMMUTABLE_DB = False
+
 # Paths
 CHAT_DB_PATH = os.path.expanduser("~/Library/Messages/chat.db")
 ATTACHMENTS_PATH = os.path.expanduser("~/Library/Messages/Attachments")
 OUTPUT_DIR = "/Volumes/Coding/Python/iMessageExtractor/iMessageExport"
 
+# Buffer size for attachment copies when the zero-copy path is unavailable
+COPY_BUFSIZE = 256 * 1024
+
+# Number of message rows fetched from SQLite at a time
+FETCH_BATCH_SIZE = 10000
+
+# Number of attachments copied in parallel (lower this for slow network volumes)
+COPY_WORKERS = 8
+
 # =============================================================================
 # LOGGING SETUP
 # =============================================================================
@@ -64,8 +98,22 @@ def setup_logging():
     file_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_format)
     
+    # Coalesce file records into larger writes (errors are flushed immediately)
+    buffered_handler = logging.handlers.MemoryHandler(
+        1000, flushLevel=logging.ERROR, target=file_handler, flushOnClose=True
+    )
+    
+    # Hand file records to a background thread so disk writes stay off the export loop
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, buffered_handler)
+    listener.start()
+    
+    # atexit runs in reverse order: drain the queue first, then flush the buffer
+    atexit.register(buffered_handler.flush)
+    atexit.register(listener.stop)
+    
     logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     return logger
 
@@ -73,94 +121,177 @@ def setup_logging():
 # UTILITY FUNCTIONS
 # =============================================================================
 
+# Formatting characters stripped from phone numbers before short code checks
+_PHONE_STRIP = str.maketrans('', '', '+-() ')
+
+# Characters that are not safe in file/folder names
+_FN_SANITIZE = str.maketrans({c: '_' for c in ':/\\<>"|?*\0'})
+
+# Unix timestamp of the Mac epoch (2001-01-01 00:00:00 UTC) and the output format
+_MAC_EPOCH_TS = datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+_STRFTIME = "%Y-%m-%d %H:%M:%S"
+
+# Every possible progress bar, indexed by filled length
+_BAR_LENGTH = 30
+_BARS = ['█' * i + '░' * (_BAR_LENGTH - i) for i in range(_BAR_LENGTH + 1)]
+
+# Max chats waiting on attachment copies before the export blocks on the oldest
+_MAX_OPEN_CHATS = 32
+
+# Lines a chat buffers before trying to write them out
+_WRITE_BATCH_LINES = 1000
+
+# Max attachment copies queued on the pool before the export waits for one to finish
+_MAX_QUEUED_COPIES = 1024
+
+# Plugin/app attachment extensions (lowercase, matched against lowercased filenames)
+_PLUGIN_EXTS = (
+    '.pluginpayloadattachment',  # iMessage app data
+    '.balloon',                  # Message effects
+    '.app',                      # App store links
+    '.handwriting',              # Digital touch/handwriting
+    '.digitaltouchdata',         # Digital touch data
+)
+
+@lru_cache(maxsize=4096)
 def sanitize_filename(name):
     """Sanitize a string to be safe for use as a filename/folder name."""
     if not name:
         return "Unknown"
     
-    # Replace problematic characters
-    problematic_chars = [':', '/', '\\', '<', '>', '"', '|', '?', '*']
-    for char in problematic_chars:
-        name = name.replace(char, '_')
-    
-    # Remove leading/trailing whitespace and dots
-    name = name.strip(' .')
-    
-    # Limit length
-    if len(name) > 100:
-        name = name[:100]
+    # Replace problematic characters, remove leading/trailing whitespace and dots, limit length
+    name = name.translate(_FN_SANITIZE).strip(' .')[:100]
     
     return name if name else "Unknown"
 
 def format_timestamp(timestamp):
     """Convert Mac timestamp to readable format."""
-    # Mac timestamps are seconds since 2001-01-01 00:00:00 UTC
-    mac_epoch = datetime.datetime(2001, 1, 1)
+    # Mac timestamps are nanoseconds since 2001-01-01 00:00:00 UTC
     if timestamp:
         try:
-            dt = mac_epoch + datetime.timedelta(seconds=timestamp / 1000000000)
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-        except (ValueError, OverflowError):
+            dt = datetime.datetime.fromtimestamp(_MAC_EPOCH_TS + timestamp * 1e-9, datetime.timezone.utc)
+            return dt.strftime(_STRFTIME)
+        except (ValueError, OverflowError, OSError):
             return "Unknown Time"
     return "Unknown Time"
 
-def print_progress(current, total, operation="Processing"):
+def print_progress(current, total, operation="Processing", _state=[-1]):
     """Print progress bar with percentage."""
     if total == 0:
         return
     
+    filled_length = int(_BAR_LENGTH * current // total)
+    
+    # Only redraw when the bar changes (and always on completion)
+    if filled_length == _state[0] and current != total:
+        return
+    _state[0] = filled_length
+    
     percentage = (current / total) * 100
-    bar_length = 30
-    filled_length = int(bar_length * current // total)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
+    bar = _BARS[filled_length]
     
-    print(f"\r{operation}: [{bar}] {percentage:.1f}% ({current}/{total})", end='', flush=True)
+    sys.stdout.write(f"\r{operation}: [{bar}] {percentage:.1f}% ({current}/{total})")
+    sys.stdout.flush()
 
+@lru_cache(maxsize=4096)
 def is_short_code_number(identifier):
     """Check if identifier is a short code (2FA, etc.) - 6 digits or less."""
-    if not identifier:
+    # Emails and full phone numbers are by far the common case - reject them before allocating
+    if not identifier or '@' in identifier or len(identifier) > 16:
         return False
     
     # Remove common formatting characters
-    clean_number = identifier.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
+    clean_number = identifier.translate(_PHONE_STRIP)
     
     # Check if it's all digits and 6 or fewer characters
-    if clean_number.isdigit() and len(clean_number) <= 6:
-        return True
-    
-    return False
+    return clean_number.isdigit() and len(clean_number) <= 6
 
 def is_plugin_attachment(filename):
     """Check if this is a plugin/app attachment rather than a regular file."""
-    if not filename:
+    return bool(filename) and filename.lower().endswith(_PLUGIN_EXTS)
+
+def attachment_dest_name(filename, transfer_name):
+    """Return the file name an attachment is saved under in its contact folder."""
+    return (filename or '').rpartition('/')[2] or transfer_name or "unknown_attachment"
+
+def _clonefile(src, dst):
+    """Clone src to dst on APFS (instant, shares blocks). Returns False if not possible."""
+    if _clonefile_fn is None:
         return False
     
-    plugin_extensions = [
-        '.pluginPayloadAttachment',  # iMessage app data
-        '.balloon',                  # Message effects
-        '.app',                      # App store links
-        '.handwriting',              # Digital touch/handwriting
-        '.digitaltouchdata'          # Digital touch data
-    ]
-    
-    return any(filename.lower().endswith(ext.lower()) for ext in plugin_extensions)
+    # Fails when dst exists or the files are on different volumes - caller falls back to copying
+    return _clonefile_fn(os.fsencode(src), os.fsencode(dst), 0) == 0
 
-def print_progress(current, total, operation="Processing"):
-    """Print progress bar with percentage."""
-    if total == 0:
-        return
-    
-    percentage = (current / total) * 100
-    bar_length = 30
-    filled_length = int(bar_length * current // total)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-    
-    print(f"\r{operation}: [{bar}] {percentage:.1f}% ({current}/{total})", end='', flush=True)
+def _fastcopy(src, dst):
+    """Copy file contents from src to dst, keeping the data in kernel space when possible."""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            if sys.platform == 'darwin':
+                # fcopyfile(3) - same call shutil uses internally on macOS
+                posix._fcopyfile(fsrc.fileno(), fdst.fileno(), posix._COPYFILE_DATA)
+                return
+            if sys.platform.startswith('linux'):
+                offset = 0
+                while True:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, 1 << 30)
+                    if sent == 0:
+                        return
+                    offset += sent
+        except OSError as e:
+            # Exotic filesystems (network volumes, FUSE) may not support the fast path
+            if e.errno not in (errno.EINVAL, errno.ENOTSUP):
+                raise
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        
+        shutil.copyfileobj(fsrc, fdst, length=COPY_BUFSIZE)
 
 # =============================================================================
 # DATABASE OPERATIONS
 # =============================================================================
 
+# Every chat with its display name and participant handles
+CHATS_QUERY = """
+SELECT DISTINCT
+    c.chat_identifier,
+    c.display_name,
+    c.room_name,
+    h.id as phone_or_email
+FROM chat c
+LEFT JOIN chat_handle_join chj ON c.ROWID = chj.chat_id
+LEFT JOIN handle h ON chj.handle_id = h.ROWID
+ORDER BY c.chat_identifier
+"""
+
+# Every message with its sender and attachments - one row per attachment
+MESSAGES_QUERY = """
+SELECT 
+    c.chat_identifier,
+    CASE WHEN m.date THEN
+        COALESCE(strftime('%Y-%m-%d %H:%M:%S', m.date / 1000000000 + 978307200, 'unixepoch'), 'Unknown Time')
+    ELSE 'Unknown Time' END as timestamp,
+    m.text,
+    m.is_from_me,
+    CASE WHEN m.is_from_me THEN 'You' ELSE COALESCE(NULLIF(h.id, ''), 'Unknown') END as sender,
+    m.ROWID as message_id,
+    a.ROWID as attachment_id,
+    a.filename,
+    a.transfer_name,
+    a.mime_type,
+    a.total_bytes
+FROM message m
+JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
+JOIN chat c ON cmj.chat_id = c.ROWID
+LEFT JOIN handle h ON m.handle_id = h.ROWID
+LEFT JOIN message_attachment_join maj ON maj.message_id = m.ROWID
+LEFT JOIN attachment a ON maj.attachment_id = a.ROWID
+ORDER BY c.chat_identifier, m.date ASC, m.ROWID ASC
+"""
+
+# Oldest and newest message dates, for the summary
+TIMEFRAME_QUERY = "SELECT MIN(date), MAX(date) FROM message WHERE date > 0"
+
 class iMessageExporter:
     def __init__(self, logger):
         self.logger = logger
@@ -171,16 +302,25 @@ class iMessageExporter:
             'attachments_copied': 0,
             'attachments_skipped': 0,
             'attachments_failed': 0,
-            'contacts_processed': 0
+            'plugin_attachments_skipped': 0,
+            'attachments_found_alternative': 0,
+            'contacts_processed': 0,
+            'earliest_message': None,
+            'latest_message': None,
+            'failed_files': []
         }
         
-    def connect_to_database(self):
-        """Connect to the iMessage database."""
-        if not os.path.exists(CHAT_DB_PATH):
-            self.logger.error(f"❌ iMessage database not found at: {CHAT_DB_PATH}")
-            self.logger.error("💡 Make sure you're running this on macOS with iMessage enabled")
-            return None
-    
+        # Root folder for per-contact attachment folders, and the ones created so far
+        self.attachments_dir = os.path.join(OUTPUT_DIR, "attachments")
+        self._folders_created = set()
+        
+        # Names of files already present in each destination folder (resume mode)
+        self._existing = {}
+        
+        # copy_attachment runs on worker threads - guards stats and folder scans
+        self._stats_lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        
     def connect_to_database(self):
         """Connect to the iMessage database."""
         if not os.path.exists(CHAT_DB_PATH):
@@ -189,25 +329,20 @@ class iMessageExporter:
             return None
             
         try:
-            conn = sqlite3.connect(CHAT_DB_PATH)
-            self.logger.info(f"✅ Connected to iMessage database")
-            return conn
-        except sqlite3.Error as e:
-            self.logger.error(f"❌ Failed to connect to database: {e}")
-            if "unable to open database file" in str(e).lower():
-                self.logger.error("")
-                self.logger.error("🔒 PERMISSION ERROR - Full Disk Access Required!")
-                self.logger.error("📋 To fix this:")
-                self.logger.error("   1. Open System Settings → Privacy & Security → Full Disk Access")
-                self.logger.error("   2. Click the + button")
-                self.logger.error("   3. Add 'Terminal' (or your Python app)")
-                self.logger.error("   4. Quit and reopen Terminal")
-                self.logger.error("   5. Run this script again")
-                self.logger.error("")
-            return None
+            # Open read-only - we never write to chat.db. Immutable only on request,
+            # since Messages keeps recent messages in the WAL file until it checkpoints.
+            db_uri = Path(os.path.abspath(CHAT_DB_PATH)).as_uri() + "?mode=ro"
+            if IMMUTABLE_DB:
+                db_uri += "&immutable=1"
+            conn = sqlite3.connect(db_uri, uri=True, cached_statements=256)
+            
+            # Large page cache + memory-mapped reads for the big read-only scans. temp_store stays
+            # at its default: MESSAGES_QUERY's ORDER BY sorts every message, and the sorter must be
+            # able to spill to disk once it outgrows the cache size instead of holding it all in RAM
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA cache_size=-262144")
+            conn.execute("PRAGMA mmap_size=268435456")
             
-        try:
-            conn = sqlite3.connect(CHAT_DB_PATH)
             self.logger.info(f"✅ Connected to iMessage database")
             return conn
         except sqlite3.Error as e:
@@ -228,26 +363,9 @@ class iMessageExporter:
         """Get all contacts and chat information."""
         self.logger.info("🔍 Analyzing chat database...")
         
-        # Get total count first
-        count_query = "SELECT COUNT(DISTINCT chat_identifier) FROM chat"
-        cursor = conn.cursor()
-        cursor.execute(count_query)
-        total_chats = cursor.fetchone()[0]
-        
-        query = """
-        SELECT DISTINCT
-            c.chat_identifier,
-            c.display_name,
-            c.room_name,
-            h.id as phone_or_email
-        FROM chat c
-        LEFT JOIN chat_handle_join chj ON c.ROWID = chj.chat_id
-        LEFT JOIN handle h ON chj.handle_id = h.ROWID
-        ORDER BY c.chat_identifier
-        """
-        
         try:
-            cursor.execute(query)
+            cursor = conn.cursor()
+            cursor.execute(CHATS_QUERY)
             results = cursor.fetchall()
             
             # Group by chat identifier
@@ -258,12 +376,22 @@ class iMessageExporter:
                 if chat_id not in chats:
                     chats[chat_id] = {
                         'display_name': display_name or room_name,
-                        'handles': set(),
+                        'handles': [],
                         'chat_identifier': chat_id
                     }
                 
-                if phone_or_email:
-                    chats[chat_id]['handles'].add(phone_or_email)
+                # Chats have a handful of handles - a list with a membership check beats a set
+                handles = chats[chat_id]['handles']
+                if phone_or_email and phone_or_email not in handles:
+                    handles.append(phone_or_email)
+            
+            # Resolve each chat's label once - it names both the conversation header and the attachment folder
+            for chat in chats.values():
+                display_name, handles = chat['display_name'], chat['handles']
+                if display_name and handles:
+                    chat['label'] = f"{display_name} ({handles[0]})"
+                else:
+                    chat['label'] = display_name or (handles[0] if handles else chat['chat_identifier'])
             
             self.logger.info(f"📊 Found {len(chats)} conversations to process")
             return chats
@@ -272,316 +400,52 @@ class iMessageExporter:
             self.logger.error(f"❌ Error fetching contacts: {e}")
             return {}
     
-    def get_messages_for_chat(self, conn, chat_identifier):
-        """Get all messages for a specific chat."""
-        query = """
-        SELECT 
-            m.date,
-            m.text,
-            m.is_from_me,
-            h.id as sender_handle,
-            m.ROWID as message_id
-        FROM message m
-        JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
-        JOIN chat c ON cmj.chat_id = c.ROWID
-        LEFT JOIN handle h ON m.handle_id = h.ROWID
-        WHERE c.chat_identifier = ?
-        ORDER BY m.date ASC
-        """
+    def get_all_messages(self, conn):
+        """Get a cursor over all messages and their attachments, for every chat.
         
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, (chat_identifier,))
-            return cursor.fetchall()
-        except sqlite3.Error as e:
-            self.logger.debug(f"Error fetching messages for {chat_identifier}: {e}")
-            return []
-    
-    def get_attachments_for_message(self, conn, message_id):
-        """Get all attachments for a specific message."""
-        query = """
-        SELECT 
-            a.filename,
-            a.transfer_name,
-            a.mime_type,
-            a.total_bytes
-        FROM message_attachment_join maj
-        JOIN attachment a ON maj.attachment_id = a.ROWID
-        WHERE maj.message_id = ?
+        Returns one row per attachment (or a single row with NULL attachment columns for
+        messages without any), ordered by chat and then date so each chat's rows and each
+        message's rows are adjacent. Read in batches with fetchmany.
         """
-        
         try:
             cursor = conn.cursor()
-            cursor.execute(query, (message_id,))
-            return cursor.fetchall()
+            cursor.arraysize = FETCH_BATCH_SIZE
+            cursor.execute(MESSAGES_QUERY)
+            return cursor
         except sqlite3.Error as e:
-            self.logger.debug(f"Error fetching attachments for message {message_id}: {e}")
-            return []
+            self.logger.error(f"❌ Error fetching messages: {e}")
+            return None
     
     def create_contact_folder(self, chat_info):
         """Create and return the folder path for a contact."""
-        # Determine the best display name
-        display_name = chat_info.get('display_name', '')
-        handles = list(chat_info.get('handles', []))
-        chat_id = chat_info.get('chat_identifier', '')
-        
-        if display_name:
-            if handles:
-                folder_name = f"{display_name} ({handles[0]})"
-            else:
-                folder_name = display_name
-        elif handles:
-            folder_name = handles[0]
-        else:
-            folder_name = chat_id or "Unknown Contact"
-        
-        # Sanitize the folder name
-        folder_name = sanitize_filename(folder_name)
+        # Named after the chat's label, falling back to its identifier
+        folder_name = sanitize_filename(chat_info.get('label') or chat_info.get('chat_identifier') or "Unknown Contact")
         
         # Create folder path
-        attachments_dir = os.path.join(OUTPUT_DIR, "attachments")
-        contact_folder = os.path.join(attachments_dir, folder_name)
+        contact_folder = os.path.join(self.attachments_dir, folder_name)
         
-        if not DRY_RUN:
+        # Several chats can share a folder - only create it once
+        if not DRY_RUN and contact_folder not in self._folders_created:
             os.makedirs(contact_folder, exist_ok=True)
+            self._folders_created.add(contact_folder)
         
         return contact_folder
-
-    def export_conversations(self):
-        """Main export function."""
-        start_time = time.time()
-        self.logger.info("🚀 Starting iMessage export process...")
-        self.logger.info(f"📂 Output directory: {OUTPUT_DIR}")
-        
-        if CONFIG.NORTH_AMERICA_ONLY:
-            self.logger.info("🇺🇸 REGION MODE - US/Canada numbers only")
-        
-        if CONFIG.SKIP_SHORT_CODES:
-            self.logger.info("📱 FILTERING MODE - Skipping 2FA/short code conversations")
-        
-        if CONFIG.SEARCH_ALTERNATIVE_LOCATIONS:
-            self.logger.info("🔍 ENHANCED MODE - Searching alternative locations for missing files")
-        
-        if RESUME_MODE:
-            self.logger.info("⏭️  RESUME MODE - Skipping existing files")
-        
-        if DRY_RUN:
-            self.logger.info("🧪 DRY RUN MODE - No files will be modified")
-        
-        # Connect to database
-        conn = self.connect_to_database()
-        if not conn:
-            return False
-        
-        try:
-            # Get all chats
-            chats = self.get_contacts_and_chats(conn)
-            if not chats:
-                self.logger.warning("⚠️  No chats found in database")
-                return False
-            
-            # Prepare output
-            if not DRY_RUN:
-                os.makedirs(OUTPUT_DIR, exist_ok=True)
-                os.makedirs(os.path.join(OUTPUT_DIR, "attachments"), exist_ok=True)
-            
-            messages_content = []
-            total_chats = len(chats)
-            current_chat = 0
-            
-            # Process each chat
-            for chat_id, chat_info in chats.items():
-                current_chat += 1
-                
-                # Show progress
-                display_name = chat_info.get('display_name', chat_id)
-                print_progress(current_chat, total_chats, f"Processing chats")
-                
-                # Get messages for this chat
-                messages = self.get_messages_for_chat(conn, chat_id)
-                if not messages:
-                    continue
-                
-                self.stats['conversations'] += 1
-                self.stats['contacts_processed'] += 1
-                
-                # Create contact folder for attachments
-                contact_folder = self.create_contact_folder(chat_info)
-                
-                # Format conversation header with contact name
-                display_name = chat_info.get('display_name', '')
-                handles = list(chat_info.get('handles', []))
-                
-                # Try to get real contact name
-                contact_name = None
-                primary_handle = None
-                for handle in handles:
-                    contact_name = self.get_contact_name(handle)
-                    if contact_name:
-                        primary_handle = handle
-                        break
-                
-                if not contact_name and chat_id:
-                    contact_name = self.get_contact_name(chat_id)
-                    primary_handle = chat_id
-                
-                # Build header
-                if contact_name:
-                    if primary_handle:
-                        header = f"=== Conversation with {contact_name} ({primary_handle}) ==="
-                    else:
-                        header = f"=== Conversation with {contact_name} ==="
-                elif display_name and handles:
-                    header = f"=== Conversation with {display_name} ({handles[0]}) ==="
-                elif display_name:
-                    header = f"=== Conversation with {display_name} ==="
-                elif handles:
-                    header = f"=== Conversation with {handles[0]} ==="
-                else:
-                    header = f"=== Conversation with {chat_id} ==="
-                
-                messages_content.append(header)
-                
-                # Process each message
-                for msg_date, msg_text, is_from_me, sender_handle, message_id in messages:
-                    self.stats['messages'] += 1
-                    
-                    # Track message timeframe
-                    if msg_date:
-                        if self.stats['earliest_message'] is None or msg_date < self.stats['earliest_message']:
-                            self.stats['earliest_message'] = msg_date
-                        if self.stats['latest_message'] is None or msg_date > self.stats['latest_message']:
-                            self.stats['latest_message'] = msg_date
-                    
-                    # Format timestamp
-                    timestamp = format_timestamp(msg_date)
-                    
-                    # Determine sender with contact name resolution
-                    if is_from_me:
-                        sender = "You"
-                    else:
-                        # Try to get real contact name for sender
-                        sender_contact_name = self.get_contact_name(sender_handle) if sender_handle else None
-                        if sender_contact_name:
-                            sender = sender_contact_name
-                        else:
-                            sender = chat_info.get('display_name') or sender_handle or "Unknown"
-                    
-                    # Get attachments for this message
-                    attachments = self.get_attachments_for_message(conn, message_id)
-                    
-                    # Format message text
-                    if msg_text and msg_text.strip():
-                        messages_content.append(f"[{timestamp}] {sender}: {msg_text}")
-                    
-                    # Process attachments
-                    for attachment in attachments:
-                        self.stats['attachments_found'] += 1
-                        
-                        success, result = self.copy_attachment(attachment, contact_folder)
-                        
-                        if success == "plugin":
-                            # Plugin attachment - log but don't treat as failure
-                            messages_content.append(f"[{timestamp}] {sender}: [App Data: {result}]")
-                        elif success:
-                            self.stats['attachments_copied'] += 1
-                            messages_content.append(f"[{timestamp}] {sender}: [Attachment: {result}]")
-                        else:
-                            self.stats['attachments_failed'] += 1
-                            attachment_name = os.path.basename(attachment[0]) if attachment[0] else "unknown"
-                            messages_content.append(f"[{timestamp}] {sender}: [Missing Attachment: {attachment_name}]")
-                
-                messages_content.append("")  # Empty line between conversations
-            
-            print()  # New line after progress bar
-            
-            # Write messages file
-            self.logger.info("💾 Writing chat history...")
-            messages_file = os.path.join(OUTPUT_DIR, "messages.txt")
-            if not DRY_RUN:
-                with open(messages_file, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(messages_content))
-                self.logger.info(f"✅ Chat history exported to: messages.txt")
-            else:
-                self.logger.info(f"[DRY RUN] Would write messages to: messages.txt")
-            
-            # Calculate time taken
-            elapsed_time = time.time() - start_time
-            
-            # Print summary
-            self.print_summary(elapsed_time)
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"❌ Unexpected error during export: {e}")
-            import traceback
-            self.logger.debug(traceback.format_exc())
-            return False
-        
-        finally:
-            conn.close()
     
-    def print_summary(self, elapsed_time):
-        """Print export summary statistics."""
-        print("\n" + "="*60)
-        print("📊 EXPORT SUMMARY")
-        print("="*60)
-        print(f"⏱️  Time taken: {elapsed_time:.1f} seconds")
-        
-        # Show timeframe
-        if self.stats['earliest_message'] and self.stats['latest_message']:
-            earliest = format_timestamp(self.stats['earliest_message'])
-            latest = format_timestamp(self.stats['latest_message'])
-            print(f"📅 Message timeframe: {earliest} to {latest}")
-        
-        print(f"👥 Contacts processed: {self.stats['contacts_processed']}")
-        print(f"💬 Conversations exported: {self.stats['conversations']}")
-        print(f"📝 Total messages: {self.stats['messages']}")
-        print(f"📎 Attachments found: {self.stats['attachments_found']}")
-        print(f"✅ Attachments copied: {self.stats['attachments_copied']}")
-        if self.stats['plugin_attachments_skipped'] > 0:
-            print(f"📱 App/plugin data skipped: {self.stats['plugin_attachments_skipped']}")
-        if self.stats['attachments_found_alternative'] > 0:
-            print(f"🔍 Attachments found via search: {self.stats['attachments_found_alternative']}")
-        if self.stats['attachments_skipped'] > 0:
-            print(f"⏭️  Attachments skipped (already exist): {self.stats['attachments_skipped']}")
-        if self.stats['attachments_failed'] > 0:
-            print(f"❌ Attachments failed: {self.stats['attachments_failed']}")
-        
-        if DRY_RUN:
-            print("\n🧪 This was a DRY RUN - no files were actually modified")
-        else:
-            print(f"\n📂 Export completed! Check: {OUTPUT_DIR}")
-        
-        # Write failed files report
-        if self.stats['failed_files'] and not DRY_RUN:
-            try:
-                failed_file = os.path.join(OUTPUT_DIR, "failed_attachments.txt")
-                with open(failed_file, 'w', encoding='utf-8') as f:
-                    f.write("FAILED ATTACHMENTS REPORT\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(f"Total failed: {len(self.stats['failed_files'])}\n\n")
-                    for i, failed in enumerate(self.stats['failed_files'], 1):
-                        f.write(f"{i}. {failed}\n")
-                print(f"📋 Failed attachments logged to: failed_attachments.txt")
-            except Exception as e:
-                print(f"⚠️  Could not write failed attachments file: {e}")
-                # At least show some examples in console
-                print(f"💡 Sample failed files:")
-                for failed in self.stats['failed_files'][:5]:
-                    print(f"   - {failed}")
-                if len(self.stats['failed_files']) > 5:
-                    print(f"   ... and {len(self.stats['failed_files']) - 5} more")
-        elif self.stats['failed_files']:
-            # Show examples even in dry run
-            print(f"💡 Sample failed files (first 5):")
-            for failed in self.stats['failed_files'][:5]:
-                print(f"   - {failed}")
-            if len(self.stats['failed_files']) > 5:
-                print(f"   ... and {len(self.stats['failed_files']) - 5} more")
-        
-        # Log to file
-        self.logger.debug(f"Export completed - {self.stats}")
+    def _existing_files(self, folder):
+        """Return the set of file names already in a folder, scanning it only once."""
+        with self._scan_lock:
+            existing = self._existing.get(folder)
+            if existing is None:
+                existing = set()
+                try:
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            if entry.is_file():
+                                existing.add(entry.name)
+                except OSError:
+                    pass
+                self._existing[folder] = existing
+            return existing
     
     def copy_attachment(self, attachment_info, destination_folder):
         """Copy an attachment to the destination folder."""
@@ -594,15 +458,14 @@ class iMessageExporter:
         source_path = os.path.expanduser(filename)
         
         # Extract just the filename for destination
-        dest_filename = os.path.basename(filename)
-        if not dest_filename:
-            dest_filename = transfer_name or "unknown_attachment"
+        dest_filename = attachment_dest_name(filename, transfer_name)
         
-        dest_path = os.path.join(destination_folder, dest_filename)
+        dest_path = destination_folder + os.sep + dest_filename
         
-        # Check if file already exists (resume mode)
-        if RESUME_MODE and os.path.exists(dest_path):
-            self.stats['attachments_skipped'] += 1
+        # Check if file already exists - copies are renamed into place once complete, so it is never partial
+        if RESUME_MODE and dest_filename in self._existing_files(destination_folder):
+            with self._stats_lock:
+                self.stats['attachments_skipped'] += 1
             return True, dest_filename  # Skip, but count as success
         
         if not os.path.exists(source_path):
@@ -610,39 +473,95 @@ class iMessageExporter:
         
         try:
             if not DRY_RUN:
-                shutil.copy2(source_path, dest_path)
+                # Copy under a hidden temp name, then rename - an interrupted run never leaves a partial file
+                temp_path = destination_folder + os.sep + "." + dest_filename + ".part"
+                try:
+                    if not _clonefile(source_path, temp_path):
+                        _fastcopy(source_path, temp_path)
+                        shutil.copystat(source_path, temp_path)
+                    os.replace(temp_path, dest_path)
+                except OSError:
+                    try:
+                        os.unlink(temp_path)
+                    except OSError:
+                        pass
+                    raise
+                if RESUME_MODE:
+                    self._existing[destination_folder].add(dest_filename)
             
             return True, dest_filename
         
         except (IOError, OSError) as e:
             return False, f"Copy failed: {e}"
     
+    def _copy_line(self, copy, in_flight):
+        """Wait for a queued attachment copy and return its line for messages.txt."""
+        future, dest_path, prefix, attachment = copy
+        success, result = future.result()
+        if in_flight.get(dest_path) is future:
+            del in_flight[dest_path]
+        
+        if success:
+            self.stats['attachments_copied'] += 1
+            return prefix + "[Attachment: " + result + "]"
+        
+        self.stats['attachments_failed'] += 1
+        self.stats['failed_files'].append(result)
+        attachment_name = attachment[0].rpartition('/')[2] if attachment[0] else "unknown"
+        return prefix + "[Missing Attachment: " + attachment_name + "]"
+    
+    def _write_ready(self, open_chats, in_flight, messages_out, wait=False):
+        """Write chat lines out in order, stopping at the first attachment copy still running.
+        
+        With wait, block on the oldest chat's copies until that chat is written out completely.
+        """
+        while open_chats:
+            chat = open_chats[0]
+            lines = chat[0]
+            while lines:
+                line = lines[0]
+                if line.__class__ is tuple:
+                    # Queued copy - its line is known once the copy finishes
+                    if not (wait or line[0].done()):
+                        return
+                    line = self._copy_line(line, in_flight)
+                lines.popleft()
+                if messages_out:
+                    messages_out.write(line)
+                    messages_out.write('\n')
+            
+            # Still being read - more lines to come
+            if chat[1]:
+                return
+            open_chats.popleft()
+            if wait:
+                return
+    
     def export_conversations(self):
         """Main export function."""
         start_time = time.time()
         self.logger.info("🚀 Starting iMessage export process...")
         self.logger.info(f"📂 Output directory: {OUTPUT_DIR}")
         
-        if CONFIG.NORTH_AMERICA_ONLY:
-            self.logger.info("🇺🇸 REGION MODE - US/Canada numbers only")
-        
-        if CONFIG.SKIP_SHORT_CODES:
-            self.logger.info("📱 FILTERING MODE - Skipping 2FA/short code conversations")
-        
-        if CONFIG.SEARCH_ALTERNATIVE_LOCATIONS:
-            self.logger.info("🔍 ENHANCED MODE - Searching alternative locations for missing files")
+        if DRY_RUN:
+            self.logger.info("🧪 DRY RUN MODE - No files will be modified")
         
         if RESUME_MODE:
             self.logger.info("⏭️  RESUME MODE - Skipping existing files")
         
-        if DRY_RUN:
-            self.logger.info("🧪 DRY RUN MODE - No files will be modified")
+        if IMMUTABLE_DB:
+            self.logger.info("🔒 IMMUTABLE MODE - Reading chat.db without locks (quit Messages first)")
         
         # Connect to database
         conn = self.connect_to_database()
         if not conn:
             return False
         
+        # Attachment copies are I/O bound - overlap them on a thread pool
+        pool = ThreadPoolExecutor(max_workers=COPY_WORKERS)
+        messages_out = None
+        completed = False
+        
         try:
             # Get all chats
             chats = self.get_contacts_and_chats(conn)
@@ -653,338 +572,158 @@ class iMessageExporter:
             # Prepare output
             if not DRY_RUN:
                 os.makedirs(OUTPUT_DIR, exist_ok=True)
-                os.makedirs(os.path.join(OUTPUT_DIR, "attachments"), exist_ok=True)
+                os.makedirs(self.attachments_dir, exist_ok=True)
             
-            messages_content = []
-            total_chats = len(chats)
-            current_chat = 0
-            
-            # Process each chat
-            for chat_id, chat_info in chats.items():
-                current_chat += 1
-                
-                # Show progress
-                display_name = chat_info.get('display_name', chat_id)
-                print_progress(current_chat, total_chats, f"Processing chats")
-                
-                # Get messages for this chat
-                messages = self.get_messages_for_chat(conn, chat_id)
-                if not messages:
-                    continue
-                
-                self.stats['conversations'] += 1
-                self.stats['contacts_processed'] += 1
-                
-                # Create contact folder for attachments
-                contact_folder = self.create_contact_folder(chat_info)
-                
-                # Format conversation header with contact name
-                display_name = chat_info.get('display_name', '')
-                handles = list(chat_info.get('handles', []))
-                
-                # Try to get real contact name
-                contact_name = None
-                primary_handle = None
-                for handle in handles:
-                    contact_name = self.get_contact_name(handle)
-                    if contact_name:
-                        primary_handle = handle
-                        break
-                
-                if not contact_name and chat_id:
-                    contact_name = self.get_contact_name(chat_id)
-                    primary_handle = chat_id
-                
-                # Build header
-                if contact_name:
-                    if primary_handle:
-                        header = f"=== Conversation with {contact_name} ({primary_handle}) ==="
-                    else:
-                        header = f"=== Conversation with {contact_name} ==="
-                elif display_name and handles:
-                    header = f"=== Conversation with {display_name} ({handles[0]}) ==="
-                elif display_name:
-                    header = f"=== Conversation with {display_name} ==="
-                elif handles:
-                    header = f"=== Conversation with {handles[0]} ==="
-                else:
-                    header = f"=== Conversation with {chat_id} ==="
-                
-                messages_content.append(header)
-                
-                # Process each message
-                total_messages = len(messages)
-                for msg_idx, (msg_date, msg_text, is_from_me, sender_handle, message_id) in enumerate(messages):
-                    self.stats['messages'] += 1
-                    
-                    # Track message timeframe
-                    if msg_date:
-                        if self.stats['earliest_message'] is None or msg_date < self.stats['earliest_message']:
-                            self.stats['earliest_message'] = msg_date
-                        if self.stats['latest_message'] is None or msg_date > self.stats['latest_message']:
-                            self.stats['latest_message'] = msg_date
-                    
-                    # Format timestamp
-                    timestamp = format_timestamp(msg_date)
-                    
-                    # Determine sender with contact name resolution
-                    if is_from_me:
-                        sender = "You"
-                    else:
-                        # Try to get real contact name for sender
-                        sender_contact_name = self.get_contact_name(sender_handle) if sender_handle else None
-                        if sender_contact_name:
-                            sender = sender_contact_name
-                        else:
-                            sender = chat_info.get('display_name') or sender_handle or "Unknown"
-                    
-                    # Get attachments for this message
-                    attachments = self.get_attachments_for_message(conn, message_id)
-                    
-                    # Format message text
-                    if msg_text and msg_text.strip():
-                        messages_content.append(f"[{timestamp}] {sender}: {msg_text}")
-                    
-                    # Process attachments
-                    for attachment in attachments:
-                        self.stats['attachments_found'] += 1
-                        
-                        success, result = self.copy_attachment(attachment, contact_folder)
-                        
-                        if success == "plugin":
-                            # Plugin attachment - log but don't treat as failure
-                            messages_content.append(f"[{timestamp}] {sender}: [App Data: {result}]")
-                        elif success:
-                            if result not in [a[0] for a in [att for att in attachments if self.stats['attachments_skipped'] > 0]]:
-                                self.stats['attachments_copied'] += 1
-                            messages_content.append(f"[{timestamp}] {sender}: [Attachment: {result}]")
-                        else:
-                            self.stats['attachments_failed'] += 1
-                            attachment_name = os.path.basename(attachment[0]) if attachment[0] else "unknown"
-                            messages_content.append(f"[{timestamp}] {sender}: [Missing Attachment: {attachment_name}]")
-                
-                messages_content.append("")  # Empty line between conversations
-            
-            print()  # New line after progress bar
-            
-            # Write messages file
+            # Write chat history as we go, one conversation at a time
             self.logger.info("💾 Writing chat history...")
             messages_file = os.path.join(OUTPUT_DIR, "messages.txt")
             if not DRY_RUN:
-                with open(messages_file, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(messages_content))
-                self.logger.info(f"✅ Chat history exported to: messages.txt")
-            else:
-                self.logger.info(f"[DRY RUN] Would write messages to: messages.txt")
+                # Temp file in the same folder, renamed into place once complete
+                messages_out = open(os.path.join(OUTPUT_DIR, ".messages.txt.tmp"), 'w', encoding='utf-8', buffering=1 << 20)
             
-            # Calculate time taken
-            elapsed_time = time.time() - start_time
+            total_chats = len(chats)
             
-            # Print summary
-            self.print_summary(elapsed_time)
-            return True
+            # Both queries order chats by chat_identifier, so progress can follow the chats dict
+            chat_positions = {chat_id: position for position, chat_id in enumerate(chats, 1)}
             
-        except Exception as e:
-            self.logger.error(f"❌ Unexpected error during export: {e}")
-            import traceback
-            self.logger.debug(traceback.format_exc())
-            return False
-        
-        finally:
-            conn.close()
-    
-    def print_summary(self, elapsed_time):
-        """Print export summary statistics."""
-        print("\n" + "="*60)
-        print("📊 EXPORT SUMMARY")
-        print("="*60)
-        print(f"⏱️  Time taken: {elapsed_time:.1f} seconds")
-        
-        # Show timeframe
-        if self.stats['earliest_message'] and self.stats['latest_message']:
-            earliest = format_timestamp(self.stats['earliest_message'])
-            latest = format_timestamp(self.stats['latest_message'])
-            print(f"📅 Message timeframe: {earliest} to {latest}")
-        
-        print(f"👥 Contacts processed: {self.stats['contacts_processed']}")
-        print(f"💬 Conversations exported: {self.stats['conversations']}")
-        print(f"📝 Total messages: {self.stats['messages']}")
-        print(f"📎 Attachments found: {self.stats['attachments_found']}")
-        print(f"✅ Attachments copied: {self.stats['attachments_copied']}")
-        if self.stats['plugin_attachments_skipped'] > 0:
-            print(f"📱 App/plugin data skipped: {self.stats['plugin_attachments_skipped']}")
-        if self.stats['attachments_found_alternative'] > 0:
-            print(f"🔍 Attachments found via search: {self.stats['attachments_found_alternative']}")
-        if self.stats['attachments_skipped'] > 0:
-            print(f"⏭️  Attachments skipped (already exist): {self.stats['attachments_skipped']}")
-        if self.stats['attachments_failed'] > 0:
-            print(f"❌ Attachments failed: {self.stats['attachments_failed']}")
-        
-        if DRY_RUN:
-            print("\n🧪 This was a DRY RUN - no files were actually modified")
-        else:
-            print(f"\n📂 Export completed! Check: {OUTPUT_DIR}")
-        
-        # Write failed files report
-        if self.stats['failed_files'] and not DRY_RUN:
-            try:
-                failed_file = os.path.join(OUTPUT_DIR, "failed_attachments.txt")
-                with open(failed_file, 'w', encoding='utf-8') as f:
-                    f.write("FAILED ATTACHMENTS REPORT\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(f"Total failed: {len(self.stats['failed_files'])}\n\n")
-                    for i, failed in enumerate(self.stats['failed_files'], 1):
-                        f.write(f"{i}. {failed}\n")
-                print(f"📋 Failed attachments logged to: failed_attachments.txt")
-            except Exception as e:
-                print(f"⚠️  Could not write failed attachments file: {e}")
-                # At least show some examples in console
-                print(f"💡 Sample failed files:")
-                for failed in self.stats['failed_files'][:5]:
-                    print(f"   - {failed}")
-                if len(self.stats['failed_files']) > 5:
-                    print(f"   ... and {len(self.stats['failed_files']) - 5} more")
-        elif self.stats['failed_files']:
-            # Show examples even in dry run
-            print(f"💡 Sample failed files (first 5):")
-            for failed in self.stats['failed_files'][:5]:
-                print(f"   - {failed}")
-            if len(self.stats['failed_files']) > 5:
-                print(f"   ... and {len(self.stats['failed_files']) - 5} more")
-        
-        # Log to file
-        self.logger.debug(f"Export completed - {self.stats}")
-    
-    def export_conversations(self):
-        """Main export function."""
-        start_time = time.time()
-        self.logger.info("🚀 Starting iMessage export process...")
-        self.logger.info(f"📂 Output directory: {OUTPUT_DIR}")
-        
-        if DRY_RUN:
-            self.logger.info("🧪 DRY RUN MODE - No files will be modified")
-        
-        if RESUME_MODE:
-            self.logger.info("⏭️  RESUME MODE - Skipping existing files")
-        
-        # Connect to database
-        conn = self.connect_to_database()
-        if not conn:
-            return False
-        
-        try:
-            # Get all chats
-            chats = self.get_contacts_and_chats(conn)
-            if not chats:
-                self.logger.warning("⚠️  No chats found in database")
+            # One query for every chat - rows come back grouped by chat, then by message
+            cursor = self.get_all_messages(conn)
+            if not cursor:
                 return False
+            rows = itertools.chain.from_iterable(iter(cursor.fetchmany, []))
             
-            # Prepare output
-            if not DRY_RUN:
-                os.makedirs(OUTPUT_DIR, exist_ok=True)
-                os.makedirs(os.path.join(OUTPUT_DIR, "attachments"), exist_ok=True)
+            # Chats not yet written out completely, oldest first: [lines, still reading]. A line is a
+            # string, or a (future, dest path, line prefix, attachment) tuple for a queued copy
+            open_chats = deque()
+            in_flight = {}
+            copy_slots = threading.BoundedSemaphore(_MAX_QUEUED_COPIES)
             
-            messages_content = []
-            total_chats = len(chats)
-            current_chat = 0
+            # Hot-loop lookups bound once
+            submit, copy_attachment, dest_name = pool.submit, self.copy_attachment, attachment_dest_name
+            release_slot = lambda _: copy_slots.release()
             
             # Process each chat
-            for chat_id, chat_info in chats.items():
-                current_chat += 1
+            for chat_id, chat_rows in itertools.groupby(rows, key=operator.itemgetter(0)):
+                chat_info = chats.get(chat_id) or {'chat_identifier': chat_id}
                 
                 # Show progress
-                display_name = chat_info.get('display_name', chat_id)
-                print_progress(current_chat, total_chats, f"Processing chats")
-                
-                # Get messages for this chat
-                messages = self.get_messages_for_chat(conn, chat_id)
-                if not messages:
-                    continue
+                print_progress(chat_positions.get(chat_id, 0), total_chats, f"Processing chats")
                 
                 self.stats['conversations'] += 1
                 self.stats['contacts_processed'] += 1
                 
                 # Create contact folder for attachments
                 contact_folder = self.create_contact_folder(chat_info)
-                
-                # Format conversation header
-                display_name = chat_info.get('display_name', '')
-                handles = list(chat_info.get('handles', []))
-                if display_name and handles:
-                    header = f"=== Conversation with {display_name} ({handles[0]}) ==="
-                elif display_name:
-                    header = f"=== Conversation with {display_name} ==="
-                elif handles:
-                    header = f"=== Conversation with {handles[0]} ==="
-                else:
-                    header = f"=== Conversation with {chat_id} ==="
-                
-                messages_content.append(header)
-                
-                # Process each message
-                total_messages = len(messages)
-                for msg_idx, (msg_date, msg_text, is_from_me, sender_handle, message_id) in enumerate(messages):
-                    self.stats['messages'] += 1
-                    
-                    # Format timestamp
-                    timestamp = format_timestamp(msg_date)
+                folder_prefix = contact_folder + os.sep
+                
+                # Lines are written out as soon as every chat before them is done - blank line between chats
+                lines = deque([""] if self.stats['conversations'] > 1 else [])
+                lines.append(f"=== Conversation with {chat_info.get('label', chat_id)} ===")
+                chat = [lines, True]
+                open_chats.append(chat)
+                contact_name = chat_info.get('display_name')
+                append = lines.append
+                
+                last_message_id = None
+                message_count = 0
+                attachment_count = 0
+                
+                # One row per attachment - a message's rows are adjacent, grouped by message id
+                for _, timestamp, msg_text, is_from_me, sender, message_id, attachment_id, *attachment in chat_rows:
+                    # First row of a new message
+                    if message_id != last_message_id:
+                        last_message_id = message_id
+                        message_count += 1
+                        
+                        # Keep a long chat from piling up in memory
+                        if len(lines) >= _WRITE_BATCH_LINES:
+                            self._write_ready(open_chats, in_flight, messages_out)
+                        
+                        # Timestamp and sender come preformatted from SQL; a named contact overrides the handle
+                        if not is_from_me and contact_name:
+                            sender = contact_name
+                        
+                        # Shared by the text line and every attachment line of this message
+                        prefix = f"[{timestamp}] {sender}: "
+                        
+                        # Format message text
+                        if msg_text and msg_text.strip():
+                            append(prefix + msg_text)
                     
-                    # Determine sender
-                    if is_from_me:
-                        sender = "You"
-                    else:
-                        sender = chat_info.get('display_name') or sender_handle or "Unknown"
+                    if attachment_id is None:
+                        continue
                     
-                    # Get attachments for this message
-                    attachments = self.get_attachments_for_message(conn, message_id)
+                    # Queue attachment copy - its line is filled in once the copy finishes
+                    attachment = tuple(attachment)
+                    attachment_count += 1
                     
-                    # Format message text
-                    if msg_text and msg_text.strip():
-                        messages_content.append(f"[{timestamp}] {sender}: {msg_text}")
+                    # Never copy to the same destination twice at once
+                    dest_path = folder_prefix + dest_name(attachment[0], attachment[1])
+                    previous = in_flight.get(dest_path)
+                    if previous is not None:
+                        previous.result()
                     
-                    # Process attachments
-                    for attachment in attachments:
-                        self.stats['attachments_found'] += 1
-                        
-                        success, result = self.copy_attachment(attachment, contact_folder)
-                        
-                        if success:
-                            if result not in [a[0] for a in [att for att in attachments if self.stats['attachments_skipped'] > 0]]:
-                                self.stats['attachments_copied'] += 1
-                            messages_content.append(f"[{timestamp}] {sender}: [Attachment: {result}]")
-                        else:
-                            self.stats['attachments_failed'] += 1
-                            attachment_name = os.path.basename(attachment[0]) if attachment[0] else "unknown"
-                            messages_content.append(f"[{timestamp}] {sender}: [Missing Attachment: {attachment_name}]")
-                
-                messages_content.append("")  # Empty line between conversations
+                    # Bound the pool's queue - one huge chat would otherwise queue every copy at once
+                    copy_slots.acquire()
+                    future = submit(copy_attachment, attachment, contact_folder)
+                    future.add_done_callback(release_slot)
+                    in_flight[dest_path] = future
+                    append((future, dest_path, prefix, attachment))
+                
+                chat[1] = False
+                
+                # Stats merged once per chat rather than per row
+                self.stats['messages'] += message_count
+                self.stats['attachments_found'] += attachment_count
+                
+                # Let this chat's copies overlap with the next chats - block on the oldest
+                # only once too many are waiting, then write out whatever is ready
+                while len(open_chats) > _MAX_OPEN_CHATS:
+                    self._write_ready(open_chats, in_flight, messages_out, wait=True)
+                self._write_ready(open_chats, in_flight, messages_out)
             
+            while open_chats:
+                self._write_ready(open_chats, in_flight, messages_out, wait=True)
+            
+            # Chats without messages never show up above - finish the bar
+            print_progress(total_chats, total_chats, f"Processing chats")
             print()  # New line after progress bar
             
-            # Write messages file
-            self.logger.info("💾 Writing chat history...")
-            messages_file = os.path.join(OUTPUT_DIR, "messages.txt")
             if not DRY_RUN:
-                with open(messages_file, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(messages_content))
+                messages_out.close()
+                os.replace(messages_out.name, messages_file)
+                messages_out = None
                 self.logger.info(f"✅ Chat history exported to: messages.txt")
             else:
                 self.logger.info(f"[DRY RUN] Would write messages to: messages.txt")
             
+            # Message timeframe - one aggregate instead of tracking it per message
+            self.stats['earliest_message'], self.stats['latest_message'] = conn.execute(TIMEFRAME_QUERY).fetchone()
+            
             # Calculate time taken
             elapsed_time = time.time() - start_time
             
             # Print summary
             self.print_summary(elapsed_time)
+            completed = True
             return True
             
         except Exception as e:
             self.logger.error(f"❌ Unexpected error during export: {e}")
-            import traceback
-            self.logger.debug(traceback.format_exc())
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(traceback.format_exc())
             return False
         
         finally:
+            if messages_out:
+                # Export didn't finish - leave any previous messages.txt untouched
+                messages_out.close()
+                os.unlink(messages_out.name)
+            if completed:
+                pool.shutdown()
+            else:
+                # Failed or interrupted - drop the queued copies instead of waiting for all of them
+                pool.shutdown(cancel_futures=True)
             conn.close()
     
     def print_summary(self, elapsed_time):
@@ -1026,12 +765,12 @@ class iMessageExporter:
                 f.write("FAILED ATTACHMENTS REPORT\n")
                 f.write("=" * 50 + "\n\n")
                 f.write(f"Total failed: {len(self.stats['failed_files'])}\n\n")
-                for i, failed in enumerate(self.stats['failed_files'], 1):
-                    f.write(f"{i}. {failed}\n")
+                f.write("".join(f"{i}. {failed}\n" for i, failed in enumerate(self.stats['failed_files'], 1)))
             print(f"📋 Failed attachments logged to: failed_attachments.txt")
         
         # Log to file
         self.logger.debug(f"Export completed - {self.stats}")
+        self.logger.debug(f"sanitize_filename cache: {sanitize_filename.cache_info()}")
 
 # =============================================================================
 # MAIN EXECUTION